@@ -4,18 +4,46 @@ Flask Backend for PCD (Face Anonymization)
 Dipisahkan ke folder khusus `backend/flask_pcd` agar tidak bercampur dengan layanan FastAPI.
 
 Handles:
- - Menerima frame (base64) dari proses PCD eksternal (services/pcd_main.py)
+ - Menerima frame (shared memory, Socket.IO biner, POST mentah, atau base64 JSON) dari proses PCD eksternal (services/pcd_main.py)
  - Memproses frame (face blur) via services.pcd_main
- - Broadcast ke klien via Socket.IO
+ - Broadcast ke klien viewer via Socket.IO (JPEG biner, event 'frame')
  - Menyajikan Flutter Web (jika build tersedia)
 """
 
-from flask import Flask, send_from_directory, jsonify, request
-from flask_socketio import SocketIO
+try:  # eventlet must patch the stdlib before Flask/Socket.IO import sockets or threads
+    import eventlet
+    from eventlet import tpool
+    eventlet.monkey_patch()
+    _ASYNC_MODE = 'eventlet'
+except ImportError:  # pragma: no cover - fallback to Werkzeug threading mode
+    eventlet = None
+    tpool = None
+    _ASYNC_MODE = 'threading'
+
+from flask import Flask, send_from_directory, request
+from flask_socketio import SocketIO, join_room
+import binascii
+import functools
+import json
 import os
 import subprocess
 import sys
 
+try:  # SIMD-accelerated drop-in replacement for the stdlib codec
+    import pybase64 as base64
+except ImportError:  # pragma: no cover - fallback when pybase64 is missing
+    import base64
+
+try:  # Rust/SIMD JSON codec for the hot upload path
+    import orjson
+except ImportError:  # pragma: no cover - fallback to stdlib json
+    orjson = None
+
+try:  # gzip/brotli for the Flutter text assets
+    from flask_compress import Compress
+except ImportError:  # pragma: no cover - serve assets uncompressed
+    Compress = None
+
 # Import modul pcd sebagai modul, jangan import fungsi yang memicu eksekusi loop pada import
 # Pastikan modul services dapat ditemukan saat menjalankan file ini langsung
 CURRENT_DIR = os.path.dirname(__file__)
@@ -24,21 +52,129 @@ if BACKEND_ROOT not in sys.path:
     sys.path.insert(0, BACKEND_ROOT)
 
 from services import pcd_main  # type: ignore
+from services.frame_shm import SHM_NAME_ENV, SharedFrame  # type: ignore
 
 # --- Flask App Config ---
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret')
-socketio = SocketIO(app, cors_allowed_origins='*')
+# Compress text assets only; JPEG frames and images are already compressed
+app.config['COMPRESS_MIMETYPES'] = [
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/wasm',
+]
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+if Compress is not None:
+    Compress(app)
+
+# Socket.IO room that receives processed frames (frame producers are kept out of it)
+VIEWERS_ROOM = 'viewers'
+# Socket.IO sids currently in VIEWERS_ROOM (frames are only encoded while someone is watching)
+_viewer_sids = set()
+
+# --- Flutter Web build location (resolved once at import) ---
+BUILD_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'frontend', 'build', 'web'))
+INDEX_FILE = os.path.join(BUILD_DIR, 'index.html')
+# Flutter web output is not content-hashed (main.dart.js, flutter.js, assets/, canvaskit/ keep their URLs
+# across builds), so build files are revalidated on every use (304 via ETag/mtime). Only paths under
+# STATIC_IMMUTABLE_PREFIXES (comma-separated, for versioned directories) are cached for STATIC_MAX_AGE.
+_IMMUTABLE_PREFIXES = tuple(p.strip() for p in os.environ.get('STATIC_IMMUTABLE_PREFIXES', '').split(',') if p.strip())
+_STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', '31536000'))
+
+
+def _json_dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def _json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class _SocketIOJson:
+    """orjson adapter for python-socketio (expects str output and stdlib-style kwargs)."""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return _json_dumps(obj).decode('utf-8')
+
+    @staticmethod
+    def loads(data, *args, **kwargs):
+        return _json_loads(data)
+
+
+def ojson(obj, status: int = 200):
+    """Build a JSON response serialized with orjson (replacement for jsonify)."""
+    return app.response_class(_json_dumps(obj), status=status, mimetype='application/json')
+
+
+# Pre-serialized bodies for the per-frame upload responses. A new Response is still built per
+# request because after_request hooks (e.g. compression) may mutate it.
+_OK_BODY = b'{"status":"processed"}'
+_MISSING_IMAGE_BODY = b'{"error":"missing image field"}'
+# Content types accepted as a raw JPEG body on /upload_frame
+_RAW_FRAME_MIMETYPES = frozenset({'application/octet-stream', 'image/jpeg'})
+
+
+def _json_body(body: bytes, status: int = 200):
+    return app.response_class(body, status=status, mimetype='application/json')
+
+
+socketio = SocketIO(app, async_mode=_ASYNC_MODE, json=_SocketIOJson, cors_allowed_origins='*')
+
+
+if tpool is not None:
+    # Frame diproses di thread tpool dan tiap thread memuat DNN net sendiri (pcd_main.get_net; cv2.dnn.Net
+    # tidak boleh dipakai bersama antar thread), jadi batasi pool ke PCD_SERVER_WORKERS net
+    tpool.set_num_threads(max(1, int(os.environ.get('PCD_SERVER_WORKERS', '4'))))
+
+
+def _process_frame(jpeg_bytes: bytes) -> bytes:
+    """Run the blocking OpenCV pipeline in a real OS thread so the eventlet hub keeps serving."""
+    if tpool is not None:
+        return tpool.execute(pcd_main.process_frame_bytes, jpeg_bytes)
+    return pcd_main.process_frame_bytes(jpeg_bytes)
+
+
+def _encode_frame(frame, quality: int) -> bytes:
+    """JPEG-encode a BGR frame in a real OS thread so the eventlet hub keeps serving."""
+    if tpool is not None:
+        return tpool.execute(pcd_main.encode_frame_bytes, frame, quality)
+    return pcd_main.encode_frame_bytes(frame, quality)
+
+
+@functools.lru_cache(maxsize=1024)
+def _exists(path: str) -> bool:
+    """Cached os.path.exists for build assets (restart the server after rebuilding the frontend)."""
+    return os.path.exists(path)
+
+
+def _send_build_file(filename: str):
+    max_age = _STATIC_MAX_AGE if filename.startswith(_IMMUTABLE_PREFIXES) else 0
+    return send_from_directory(BUILD_DIR, filename, conditional=True, max_age=max_age)
 
 
 # --- SocketIO Events ---
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
+    # pcd_main connects with auth={'role': 'producer'}; it only uploads, so don't echo frames back to it
+    if isinstance(auth, dict) and auth.get('role') == 'producer':
+        print('✓ SocketIO frame producer connected')
+        return
+    join_room(VIEWERS_ROOM)
+    _viewer_sids.add(request.sid)
     print('✓ SocketIO client connected')
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    _viewer_sids.discard(request.sid)
     print('✓ SocketIO client disconnected')
 
 
@@ -48,12 +184,10 @@ def index():
     """
     Sajikan Flutter web build (jika ada) atau kembalikan status JSON.
     """
-    build_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'frontend', 'build', 'web'))
-    index_file = os.path.join(build_dir, 'index.html')
-    if os.path.exists(index_file):
-        return send_from_directory(build_dir, 'index.html')
+    if _exists(INDEX_FILE):
+        return _send_build_file('index.html')
 
-    return jsonify({'status': 'flask pcd backend running'})
+    return ojson({'status': 'flask pcd backend running'})
 
 
 @app.route('/<path:filename>')
@@ -61,51 +195,139 @@ def static_files(filename: str):
     """
     Sajikan file statis dari frontend/build/web jika tersedia.
     """
-    build_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'frontend', 'build', 'web'))
-    file_path = os.path.join(build_dir, filename)
-    if os.path.exists(file_path):
-        return send_from_directory(build_dir, filename)
-    return jsonify({'error': 'file not found'}), 404
+    if _exists(os.path.join(BUILD_DIR, filename)):
+        return _send_build_file(filename)
+    return ojson({'error': 'file not found'}, 404)
 
 
 # --- Receive Frame API ---
 @app.route('/upload_frame', methods=['POST'])
 def upload_frame():
     """
-    Terima image base64 (JSON {"image":"..."}) → (opsional) proses via PCD → broadcast via Socket.IO
+    Terima image → (opsional) proses via PCD → broadcast via Socket.IO
+    Body berupa JPEG mentah (application/octet-stream atau image/jpeg) atau base64 JSON {"image":"..."}.
     """
     try:
-        data = request.get_json(force=True)
-        if not data or 'image' not in data:
-            return jsonify({'error': 'missing image field'}), 400
+        if request.mimetype in _RAW_FRAME_MIMETYPES:
+            # Body sudah berupa JPEG mentah: tanpa JSON parse dan tanpa base64
+            jpeg_bytes = request.get_data()
+            if not jpeg_bytes:
+                return ojson({'error': 'empty body'}, 400)
+        else:
+            try:
+                data = _json_loads(request.get_data())
+            except ValueError:
+                return ojson({'error': 'invalid JSON body'}, 400)
+            if not isinstance(data, dict) or 'image' not in data:
+                return _json_body(_MISSING_IMAGE_BODY, 400)
 
-        img_b64 = data['image']
+            try:
+                jpeg_bytes = base64.b64decode(data['image'], validate=True)
+            except (binascii.Error, ValueError, TypeError):
+                return ojson({'error': 'invalid base64 image'}, 400)
 
         # Untuk mengurangi latency, default: JANGAN proses ulang di sini
         # Set REPROCESS_FRAMES=1 jika ingin memproses di Flask juga (double pass)
         reprocess = os.environ.get('REPROCESS_FRAMES', '0') in ('1', 'true', 'True')
         if reprocess:
             try:
-                img_b64 = pcd_main.process_frame_base64(img_b64)
+                jpeg_bytes = _process_frame(jpeg_bytes)
             except Exception as _:
                 # Jika gagal memproses, fallback kirim as-is
                 pass
 
-        # Broadcast ke semua klien
+        # Broadcast ke klien viewer sebagai JPEG biner (tanpa wrapper JSON {'image': base64})
         # Catatan: python-socketio/flask-socketio tidak menerima argumen 'compress' di emit()
         # Kompresi sudah ditangani oleh JPEG; hapus argumen khusus untuk menghindari error.
-        socketio.emit('frame', {'image': img_b64})
+        socketio.emit('frame', jpeg_bytes, to=VIEWERS_ROOM)
 
         print("→ Frame processed and broadcast to clients.")
-        return jsonify({'status': 'processed'}), 200
+        return _json_body(_OK_BODY, 200)
 
     except Exception as e:
         print('✗ Error in /upload_frame:', e)
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}, 500)
+
+
+@app.route('/upload_frame_raw', methods=['POST'])
+def upload_frame_raw():
+    """
+    Terima byte JPEG mentah (application/octet-stream) → (opsional) proses via PCD → broadcast biner
+    """
+    try:
+        jpeg_bytes = request.get_data()
+        if not jpeg_bytes:
+            return ojson({'error': 'empty body'}, 400)
+
+        if os.environ.get('REPROCESS_FRAMES', '0') in ('1', 'true', 'True'):
+            jpeg_bytes = _process_frame(jpeg_bytes)
+
+        socketio.emit('frame', jpeg_bytes, to=VIEWERS_ROOM)
+        return _json_body(_OK_BODY, 200)
+
+    except Exception as e:
+        print('✗ Error in /upload_frame_raw:', e)
+        return ojson({'error': str(e)}, 500)
+
+
+@socketio.on('upload_frame_bin')
+def handle_upload_frame_bin(data):
+    """
+    Terima byte JPEG mentah via Socket.IO (paket biner) → (opsional) proses via PCD → broadcast biner
+    Nilai return dikirim sebagai ack; produser menunggu ack sebelum mengirim frame berikutnya.
+    """
+    if not isinstance(data, (bytes, bytearray)):
+        print('✗ upload_frame_bin expects binary JPEG payload')
+        return False
+    try:
+        jpeg_bytes = bytes(data)
+        if os.environ.get('REPROCESS_FRAMES', '0') in ('1', 'true', 'True'):
+            jpeg_bytes = _process_frame(jpeg_bytes)
+        socketio.emit('frame', jpeg_bytes, to=VIEWERS_ROOM)
+        return True
+    except Exception as e:
+        print('✗ Error in upload_frame_bin:', e)
+        return False
 
 
 # --- Run Server ---
-def _start_pcd_subprocess():
+def _create_shared_frame():
+    """Create the shared-memory segment the pcd subprocess writes frames into (PCD_SHARED_MEMORY=0 disables)."""
+    if os.environ.get('PCD_SHARED_MEMORY', '1') == '0':
+        return None
+    try:
+        shared = SharedFrame.create(slots=int(os.environ.get('PCD_SHM_SLOTS', '3')))
+        print(f"✓ Shared-memory frame channel created: {shared.name}")
+        return shared
+    except Exception as e:
+        print('⚠️ Shared memory unavailable, pcd will upload over the network:', e)
+        return None
+
+
+def _shared_frame_loop(shared):
+    """Background task: JPEG-encode frames published by the pcd subprocess and broadcast them.
+
+    Nothing is encoded while no viewer is connected; the newest frame is picked up once one joins.
+    """
+    quality = int(os.environ.get('UPLOAD_JPEG_QUALITY', '60'))
+    last_seq = 0
+    while True:
+        try:
+            if not _viewer_sids:
+                socketio.sleep(0.05)
+                continue
+            item = shared.read(last_seq)
+            if item is None:
+                socketio.sleep(0.005)
+                continue
+            last_seq, frame = item
+            socketio.emit('frame', _encode_frame(frame, quality), to=VIEWERS_ROOM)
+        except Exception as e:
+            print('✗ Error in shared-memory frame loop:', e)
+            socketio.sleep(0.5)
+
+
+def _start_pcd_subprocess(shared_frame=None):
     """Menjalankan services/pcd_main.py sebagai subprocess.
     """
     script_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'pcd_main.py'))
@@ -117,6 +339,9 @@ def _start_pcd_subprocess():
     env.setdefault('BACKEND_URL', 'http://127.0.0.1:5001')  # port default untuk Flask PCD terpisah
     env['NO_DISPLAY'] = os.environ.get('NO_DISPLAY', '0')
     print(f"Starting pcd subprocess with NO_DISPLAY={env['NO_DISPLAY']}")
+    # Frame dikirim lewat shared memory, bukan upload HTTP/Socket.IO ke server sendiri
+    if shared_frame is not None:
+        env[SHM_NAME_ENV] = shared_frame.name
 
     try:
         # Jalankan dari root backend agar path relatif 'models/...' tetap valid untuk pcd_main.py
@@ -130,7 +355,10 @@ def _start_pcd_subprocess():
 
 if __name__ == '__main__':
     print("🚀 Flask PCD backend running on http://0.0.0.0:5001")
-    pcd_proc = _start_pcd_subprocess()
+    shared_frame = _create_shared_frame()
+    pcd_proc = _start_pcd_subprocess(shared_frame)
+    if shared_frame is not None:
+        socketio.start_background_task(_shared_frame_loop, shared_frame)
     try:
         socketio.run(app, host='0.0.0.0', port=5001)
     finally:
@@ -140,3 +368,9 @@ if __name__ == '__main__':
                 pcd_proc.terminate()
         except Exception:
             pass
+        if shared_frame is not None:
+            try:
+                shared_frame.close()
+                shared_frame.unlink()
+            except Exception:
+                pass
@@ -17,9 +17,9 @@ under the service folder.
 """
 from __future__ import annotations
 
-import queue
 import threading
 import wave
+from collections import deque
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
@@ -55,8 +55,8 @@ class AudioRecorder:
     """Small helper that records audio on a background thread.
 
     The recorder uses ``PyAudio`` (PortAudio) streams for portability. Frames are
-    pushed through a queue so the OpenCV loop never blocks while the WAV writer
-    drains audio samples to disk.
+    pushed through a bounded deque (append/popleft are atomic under the GIL) so the
+    OpenCV loop never blocks while the WAV writer drains audio samples to disk.
     """
 
     def __init__(
@@ -64,7 +64,7 @@ class AudioRecorder:
         *,
         sample_rate: int = 44_100,
         channels: int = 1,
-        chunk_size: int = 2048,
+        chunk_size: int = 4096,
         dtype: str = "int16",
         device: Optional[Union[int, str]] = None,
         output_dir: Optional[Path] = None,
@@ -78,7 +78,9 @@ class AudioRecorder:
         self.filename_prefix = filename_prefix
         self.output_dir = Path(output_dir) if output_dir else _RECORDINGS_DIR
 
-        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=32)
+        # Bounded: when the writer falls behind the oldest chunk is dropped automatically.
+        self._queue: "deque[Optional[bytes]]" = deque(maxlen=32)
+        self._queue_event = threading.Event()
         self._writer_thread: Optional[threading.Thread] = None
         self._reader_thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
@@ -147,7 +149,8 @@ class AudioRecorder:
                 self._pyaudio = None
 
         # Signal the writer thread to finish then close the WAV handle.
-        self._queue.put(None)
+        self._queue.append(None)
+        self._queue_event.set()
         if self._writer_thread is not None:
             self._writer_thread.join(timeout=2.0)
             self._writer_thread = None
@@ -168,25 +171,24 @@ class AudioRecorder:
             except Exception as exc:
                 print(f"⚠️ Audio capture error: {exc}")
                 break
-            try:
-                self._queue.put_nowait(data)
-            except queue.Full:
-                try:
-                    _ = self._queue.get_nowait()
-                except queue.Empty:
-                    pass
-                self._queue.put_nowait(data)
+            self._queue.append(data)
+            self._queue_event.set()
 
     def _drain_queue(self) -> None:
-        while not self._stop_event.is_set() or not self._queue.empty():
+        while True:
             try:
-                chunk = self._queue.get(timeout=0.2)
-            except queue.Empty:
+                chunk = self._queue.popleft()
+            except IndexError:
+                if self._stop_event.is_set():
+                    break
+                self._queue_event.wait(0.2)
+                self._queue_event.clear()
                 continue
             if chunk is None:
                 break
             if self._wave_handle is not None:
-                self._wave_handle.writeframes(chunk)
+                # writeframesraw skips the per-chunk header patch; close() in stop() fixes the lengths.
+                self._wave_handle.writeframesraw(chunk)
 
     # ------------------------------------------------------------------
     @property
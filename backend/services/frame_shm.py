@@ -0,0 +1,148 @@
+"""Shared-memory frame handoff between ``pcd_main`` and the Flask backend.
+
+The Flask app creates the segment before launching ``pcd_main.py`` and passes its
+name through the ``PCD_SHM_NAME`` environment variable. The subprocess copies every
+processed BGR frame straight into the segment and the backend reads it back as a
+numpy view, so the local path needs no JPEG/base64 encoding or HTTP round-trip.
+
+Layout
+------
+A 64-byte segment header followed by ``slots`` equally sized frame slots::
+
+    count (uint64) | slots (uint32) | padding | slot_capacity (uint64) | padding
+    slot i: seq (uint64) | height (uint32) | width (uint32) | padding | BGR pixels
+
+``count`` is the number of frames published so far; frame ``n`` lives in slot
+``(n - 1) % slots``. The writer fills the next slot while readers copy the newest
+one, so a reader is only raced when it falls ``slots - 1`` frames behind.
+
+Each slot ``seq`` works as a seqlock: the writer makes it odd while a frame is being
+copied and even once the frame is complete. Readers drop any frame whose ``seq`` is
+odd or changed during the copy, so they never see a half-written image. There is a
+single writer (the pcd process); any number of readers may poll.
+"""
+from __future__ import annotations
+
+import os
+import struct
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Environment variable used to hand the segment name to the pcd subprocess.
+SHM_NAME_ENV = "PCD_SHM_NAME"
+
+# Enough room for a 1080p BGR frame; larger frames fall back to the network upload.
+DEFAULT_CAPACITY = 1920 * 1080 * 3
+DEFAULT_SLOTS = 3
+
+_HEADER_SIZE = 64
+_U64 = struct.Struct("<Q")
+_U32 = struct.Struct("<I")
+_SHAPE = struct.Struct("<II")
+_SLOTS_OFFSET = 8
+_CAPACITY_OFFSET = 16
+
+
+class SharedFrame:
+    """Ring of BGR frame slots in POSIX/Windows shared memory."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self._owner = owner
+        buf = shm.buf
+        self._count = _U64.unpack_from(buf, 0)[0]
+        self.slots = _U32.unpack_from(buf, _SLOTS_OFFSET)[0]
+        self.capacity = _U64.unpack_from(buf, _CAPACITY_OFFSET)[0]
+        self._stride = _HEADER_SIZE + self.capacity
+
+    @classmethod
+    def create(cls, capacity: int = DEFAULT_CAPACITY, slots: int = DEFAULT_SLOTS) -> "SharedFrame":
+        """Create a new segment (backend side). The caller must ``unlink`` it on exit."""
+        capacity = int(capacity)
+        slots = max(2, int(slots))
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + slots * (_HEADER_SIZE + capacity))
+        buf = shm.buf
+        buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+        for i in range(slots):
+            start = _HEADER_SIZE + i * (_HEADER_SIZE + capacity)
+            buf[start:start + _HEADER_SIZE] = bytes(_HEADER_SIZE)
+        _U32.pack_into(buf, _SLOTS_OFFSET, slots)
+        _U64.pack_into(buf, _CAPACITY_OFFSET, capacity)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedFrame":
+        """Attach to a segment created by the backend (pcd side)."""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13 has no ``track`` argument
+            shm = shared_memory.SharedMemory(name=name)
+            if os.name == "posix":
+                # Otherwise the resource tracker unlinks the backend's segment when we exit.
+                try:
+                    from multiprocessing import resource_tracker
+
+                    resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+                except Exception:
+                    pass
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _slot_offset(self, n: int) -> int:
+        return _HEADER_SIZE + ((n - 1) % self.slots) * self._stride
+
+    def write(self, img: np.ndarray) -> bool:
+        """Publish a BGR frame into the next slot. Returns False when the frame does not fit."""
+        if img.ndim != 3 or img.shape[2] != 3 or img.dtype != np.uint8:
+            return False
+        h, w = img.shape[:2]
+        if h * w * 3 > self.capacity:
+            return False
+        buf = self._shm.buf
+        n = self._count + 1
+        off = self._slot_offset(n)
+        seq = _U64.unpack_from(buf, off)[0]
+        _U64.pack_into(buf, off, seq + 1)  # odd: write in progress
+        _SHAPE.pack_into(buf, off + _U64.size, h, w)
+        np.copyto(np.ndarray((h, w, 3), dtype=np.uint8, buffer=buf, offset=off + _HEADER_SIZE), img)
+        _U64.pack_into(buf, off, seq + 2)
+        self._count = n
+        _U64.pack_into(buf, 0, n)
+        return True
+
+    def latest(self) -> int:
+        """Number of frames published so far (the id of the newest frame)."""
+        return _U64.unpack_from(self._shm.buf, 0)[0]
+
+    def read(self, last_seq: int = 0) -> Optional[Tuple[int, np.ndarray]]:
+        """Return ``(frame id, frame copy)`` if a newer complete frame is available, else None.
+
+        Only the newest frame is returned; frames published in between are skipped.
+        """
+        buf = self._shm.buf
+        n = _U64.unpack_from(buf, 0)[0]
+        if n == 0 or n == last_seq:
+            return None
+        off = self._slot_offset(n)
+        seq = _U64.unpack_from(buf, off)[0]
+        if seq & 1:
+            return None
+        h, w = _SHAPE.unpack_from(buf, off + _U64.size)
+        if h == 0 or w == 0 or h * w * 3 > self.capacity:
+            return None
+        frame = np.ndarray((h, w, 3), dtype=np.uint8, buffer=buf, offset=off + _HEADER_SIZE).copy()
+        if _U64.unpack_from(buf, off)[0] != seq:
+            return None  # writer lapped the ring while copying; pick up the next one
+        return n, frame
+
+    def close(self) -> None:
+        self._shm.close()
+
+    def unlink(self) -> None:
+        if self._owner:
+            self._shm.unlink()
@@ -2,7 +2,10 @@ import sys
 import cv2
 import numpy as np
 from datetime import datetime
+import math
 import os
+import signal
+import threading
 import time
 
 """
@@ -16,24 +19,159 @@ Not optimized for production or server use.
 # --- DNN Model Configuration ---
 prototxt_path = "models/deploy.prototxt.txt"
 model_path = "models/res10_300x300_ssd_iter_140000.caffemodel"
+# Optional ONNX export of the same SSD, run with onnxruntime when present (DNN_ONNX_MODEL overrides).
+# Export once with a Caffe→ONNX converter that supports the SSD DetectionOutput layer, e.g.:
+#   python -m caffe2onnx.convert --prototxt models/deploy.prototxt.txt \
+#       --caffemodel models/res10_300x300_ssd_iter_140000.caffemodel --onnx models/res10.onnx
+# and optionally shrink it to int8 with onnxruntime.quantization.quantize_dynamic.
+onnx_model_path = os.environ.get('DNN_ONNX_MODEL', "models/res10.onnx")
 confidence_threshold = 0.5  # Minimum probability to filter weak detections
 
+# OpenCL (T-API): run the Caffe DNN on the GPU when available (USE_OPENCL=0 disables)
+use_opencl = os.environ.get('USE_OPENCL', '1') != '0' and cv2.ocl.haveOpenCL()
+cv2.ocl.setUseOpenCL(use_opencl)
+
+try:  # ONNX Runtime: MLAS AVX2/AVX-512 kernels, optional OpenVINO execution provider
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
 # --- Load the DNN Model ---
-try:
-    net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
-    print("✓ DNN face detection model loaded successfully.")
-except cv2.error as e:
-    print(f"✗ Error loading DNN model: {e}")
-    print("Make sure 'deploy.prototxt.txt' and 'res10_300x300_ssd_iter_140000.caffemodel' exist.")
-    sys.exit(1)
+sess = None
+sess_input = None
+net = None
+if ort is not None and os.path.exists(onnx_model_path):
+    try:
+        available = ort.get_available_providers()
+        providers = [p for p in ('OpenVINOExecutionProvider', 'CPUExecutionProvider') if p in available]
+        sess = ort.InferenceSession(onnx_model_path, providers=providers)
+        sess_input = sess.get_inputs()[0].name
+        print(f"✓ ONNX face detection model loaded ({', '.join(sess.get_providers())}).")
+    except Exception as e:
+        print(f"⚠️ Failed to load ONNX model ({e}), falling back to Caffe.")
+        sess = None
+
+if sess is None:
+    try:
+        net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+        if use_opencl:
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL)
+            print("✓ DNN target: OpenCL")
+        print("✓ DNN face detection model loaded successfully.")
+    except cv2.error as e:
+        print(f"✗ Error loading DNN model: {e}")
+        print("Make sure 'deploy.prototxt.txt' and 'res10_300x300_ssd_iter_140000.caffemodel' exist.")
+        sys.exit(1)
+
+
+# Asynchronous inference (DNN_ASYNC=1): forwardAsync() needs an OpenCV build with the Inference Engine (OpenVINO) backend
+dnn_async = False
+_pending = None  # AsyncArray submitted on the previous detection frame
+if net is not None and os.environ.get('DNN_ASYNC', '0') == '1':
+    try:
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        dnn_async = True
+        print("✓ DNN async inference enabled (Inference Engine backend)")
+    except (cv2.error, AttributeError) as e:
+        print(f"⚠️ DNN async unavailable ({e}); using synchronous forward()")
+
+def detect_faces(blob: np.ndarray) -> np.ndarray:
+    """Run the SSD on a (1, 3, 300, 300) blob and return detections shaped (1, 1, N, 7)."""
+    if sess is not None:
+        return sess.run(None, {sess_input: blob})[0].reshape(1, 1, -1, 7)
+    net.setInput(blob)
+    return net.forward()
+
+def detect_faces_pipelined(blob: np.ndarray):
+    """Submit blob with forwardAsync() and return the detections of the previous submission.
+
+    Inference of detection frame k then overlaps capture, blur and display of the
+    following frames; the result is one detection interval old (None on the first call).
+    Falls back to detect_faces() for good if the backend rejects async inference.
+    """
+    global dnn_async, _pending
+    if dnn_async:
+        try:
+            detections = _pending.get() if _pending is not None else None
+            net.setInput(blob)  # setInput copies, so the shared _blob buffer can be refilled meanwhile
+            _pending = net.forwardAsync()
+            return detections
+        except cv2.error as e:
+            print(f"⚠️ forwardAsync failed ({e}); falling back to synchronous forward()")
+            dnn_async = False
+            _pending = None
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL if use_opencl else cv2.dnn.DNN_TARGET_CPU)
+    return detect_faces(blob)
 
 # --- Camera and Settings ---
-capture = cv2.VideoCapture(0)
+# Pick the native backend (V4L2 / Media Foundation) instead of whatever OpenCV finds first
+camera_api = cv2.CAP_V4L2 if sys.platform.startswith('linux') else (cv2.CAP_MSMF if sys.platform == 'win32' else cv2.CAP_ANY)
+capture = cv2.VideoCapture(0, camera_api)
+if not capture.isOpened() and camera_api != cv2.CAP_ANY:
+    capture = cv2.VideoCapture(0)
 
 if not capture.isOpened():
     print("✗ Error: could not open video capture. Check your camera.")
     sys.exit(1)
 
+# MJPG is compressed on the webcam (1080p30 fits the USB bus); BUFFERSIZE=1 drops the driver's frame queue
+capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+capture.set(cv2.CAP_PROP_FRAME_WIDTH, int(os.environ.get('CAMERA_WIDTH', '1920')))
+capture.set(cv2.CAP_PROP_FRAME_HEIGHT, int(os.environ.get('CAMERA_HEIGHT', '1080')))
+capture.set(cv2.CAP_PROP_FPS, int(os.environ.get('CAMERA_FPS', '30')))
+capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+class FrameGrabber(threading.Thread):
+    """Reads the camera on a background thread so capture I/O overlaps DNN/blur work.
+
+    Only the newest frame is kept; the main loop never waits on the camera driver
+    unless it is faster than the camera itself.
+    """
+
+    def __init__(self, cap):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.lock = threading.Lock()
+        self.latest = None
+        self.running = True
+        self.failed = False
+        self._new_frame = threading.Event()
+
+    def run(self):
+        while self.running:
+            ok, frame = self.cap.read()
+            if not ok or frame is None:
+                with self.lock:
+                    self.failed = True
+                    self._new_frame.set()
+                break
+            # cap.read() returns a fresh array each call, so the reference can be handed over without a copy
+            with self.lock:
+                self.latest = frame
+                self._new_frame.set()  # under the lock, so the event never runs ahead of or behind `latest`
+
+    def read(self, timeout: float = 5.0):
+        """Return (True, frame) for a frame not returned before, or (False, None) once capture fails."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                frame, self.latest = self.latest, None
+                self._new_frame.clear()
+                failed = self.failed
+            if frame is not None:
+                return True, frame
+            remaining = deadline - time.monotonic()
+            if failed or remaining <= 0:
+                return False, None
+            self._new_frame.wait(remaining)
+
+    def stop(self):
+        self.running = False
+        self.join(timeout=1.0)
+
 # Get camera properties for video writer
 frame_width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
 frame_height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -74,26 +212,71 @@ print(f'Display enabled: {display_enabled}')
 # --- Helper Functions (Keep these as they are) ---
 def _oddize(n: int) -> int:
     """Return an odd integer >= 3 based on n."""
-    n = max(3, int(n))
-    return n if (n % 2) == 1 else n + 1
+    return max(3, int(n)) | 1
+
+# cv2.stackBlur (OpenCV >= 4.7) is O(1) per pixel regardless of kernel size; GaussianBlur is O(k)
+_stack_blur = getattr(cv2, 'stackBlur', None)
 
 def apply_gaussian_blur(image: np.ndarray, kernel_factor: int = 3) -> np.ndarray:
-    """Apply Gaussian blur to image."""
+    """Apply Gaussian blur to image (stack blur approximation when available)."""
     h, w = image.shape[:2]
     k = _oddize(max(3, min(h, w) // kernel_factor))
     # Add check for kernel size validity
     if k <= 0: return image # Return original if kernel is invalid
+    # Face ROIs stay on the CPU even with USE_OPENCL: a per-ROI UMat upload/download costs more than the blur
+    if _stack_blur is not None:
+        return _stack_blur(image, (k, k))
     return cv2.GaussianBlur(image, (k, k), 0)
 
-def apply_mosaic_blur(image: np.ndarray, block_size: int = 10) -> np.ndarray:
-    """Apply mosaic (pixelated) blur to image."""
+def apply_mosaic_blur(image: np.ndarray, block_size: int = 10, dst: np.ndarray = None) -> np.ndarray:
+    """Apply mosaic (pixelated) blur to image (pass dst=image to pixelate in place)."""
     h, w = image.shape[:2]
     # Ensure block_size is reasonable
     block_size = max(1, block_size)
     small_h, small_w = max(1, h // block_size), max(1, w // block_size)
     temp = cv2.resize(image, (small_w, small_h), interpolation=cv2.INTER_LINEAR)
-    mosaic = cv2.resize(temp, (w, h), interpolation=cv2.INTER_NEAREST)
-    return mosaic
+    return cv2.resize(temp, (w, h), dst=dst, interpolation=cv2.INTER_NEAREST)
+
+# Reusable DNN input buffers: one resize target and one float32 blob for the whole session
+_resized = np.empty((300, 300, 3), dtype=np.uint8)
+_blob = np.empty((1, 3, 300, 300), dtype=np.float32)
+_mean = np.array([104.0, 177.0, 123.0], dtype=np.float32).reshape(3, 1, 1)
+
+def make_blob(image: np.ndarray) -> np.ndarray:
+    """Equivalent of blobFromImage(resize(image, 300x300), 1.0, (300, 300), mean) without per-frame allocations."""
+    cv2.resize(image, (300, 300), dst=_resized, interpolation=cv2.INTER_LINEAR)
+    # HWC uint8 -> CHW float32 with mean subtraction, written straight into the blob
+    np.subtract(_resized.transpose(2, 0, 1), _mean, out=_blob[0])
+    return _blob
+
+# --- Lightweight face tracking between DNN passes ---
+detect_every_n = max(1, int(os.environ.get('DETECT_EVERY_N', '3')))  # Run the DNN on every Nth frame only
+track_ttl = float(os.environ.get('TRACK_TTL_MS', '1000')) / 1000.0    # Drop tracks unseen for longer than this
+track_match_dist = 0.25  # Max centroid distance (normalized to frame size) to match a detection to a track
+tracks = []  # [{'id': int, 'bbox': (startX, startY, endX, endY), 'last_seen': float}]
+_next_track_id = 0
+
+def update_tracks(boxes: np.ndarray, now: float, w: int, h: int) -> None:
+    """Match fresh detections to existing tracks by nearest centroid; start new tracks for the rest."""
+    global _next_track_id
+    unmatched = list(tracks)
+    for box in boxes:
+        cx = (box[0] + box[2]) / (2.0 * w)
+        cy = (box[1] + box[3]) / (2.0 * h)
+        best, best_d = None, track_match_dist
+        for track in unmatched:
+            tx1, ty1, tx2, ty2 = track['bbox']
+            d = math.hypot(cx - (tx1 + tx2) / (2.0 * w), cy - (ty1 + ty2) / (2.0 * h))
+            if d < best_d:
+                best, best_d = track, d
+        bbox = tuple(int(v) for v in box)
+        if best is not None:
+            unmatched.remove(best)
+            best['bbox'] = bbox
+            best['last_seen'] = now
+        else:
+            tracks.append({'id': _next_track_id, 'bbox': bbox, 'last_seen': now})
+            _next_track_id += 1
 
 def start_recording():
     """Start video recording with timestamp filename."""
@@ -119,71 +302,83 @@ def stop_recording():
         print("✓ Recording stopped")
 
 # --- Main Loop ---
-while True:
-    success, img = capture.read()
+grabber = FrameGrabber(capture)
+grabber.start()
+frame_index = 0
+
+# Ctrl+C only sets a flag, so the current frame finishes and the cleanup below always runs
+_stop = False
+
+
+def _request_stop(signum, frame):
+    global _stop
+    _stop = True
+
+
+signal.signal(signal.SIGINT, _request_stop)
+
+while not _stop:
+    success, img = grabber.read()
     if not success or img is None:
         print("Warning: failed to read frame from camera. Exiting.")
         break
 
     # Apply mirror/flip (always enabled)
-    img = cv2.flip(img, 1)
+    cv2.flip(img, 1, dst=img)  # in place: no second full-frame buffer per frame
 
-    # --- DNN Face Detection ---
+    # --- DNN Face Detection (every Nth frame; tracked boxes are reused in between) ---
     (h, w) = img.shape[:2] # Frame height and width
-    # Create blob: Resize to 300x300, apply mean subtraction (values specific to this model)
-    blob = cv2.dnn.blobFromImage(cv2.resize(img, (300, 300)), 1.0,
-        (300, 300), (104.0, 177.0, 123.0))
-
-    # Pass blob through network
-    net.setInput(blob)
-    detections = net.forward()
-
-    face_found = False # Flag to check if any face was detected in this frame
-
-    # Loop over the detections
-    for i in range(0, detections.shape[2]):
-        # Extract confidence
-        confidence = detections[0, 0, i, 2]
-
-        # Filter out weak detections
-        if confidence > confidence_threshold:
-            face_found = True
-            # Compute coordinates of the bounding box
-            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-            (startX, startY, endX, endY) = box.astype("int")
-
-            # Ensure bounding box is within frame boundaries
-            startX = max(0, startX)
-            startY = max(0, startY)
-            endX = min(w, endX)
-            endY = min(h, endY)
-
-            # Extract face ROI
-            face_roi = img[startY:endY, startX:endX]
-
-            # Check if ROI is valid before blurring
-            if face_roi.size > 0:
-                # Apply blur if enabled
-                if blur_enabled:
-                    box_w = endX - startX # Width of the detected face box
-                    if blur_type == 'gaussian':
-                        # Use box width for kernel calculation
-                        k_factor = 3
-                        # Adjust kernel size calculation
-                        k = _oddize(max(3, box_w // k_factor))
-                        blurred = apply_gaussian_blur(face_roi, kernel_factor=k_factor) # Pass k_factor instead
-                    elif blur_type == 'mosaic':
-                        # Use box width for block size calculation
-                        mosaic_block_size = max(3, box_w // 15)
-                        blurred = apply_mosaic_blur(face_roi, block_size=mosaic_block_size)
-                    else: # 'none' or unknown
-                         blurred = face_roi # No blurring if type is 'none' or invalid
-
-                    # Put blurred face back into the frame
+    now = time.monotonic()
+    if frame_index % detect_every_n == 0:
+        # Create blob: Resize to 300x300, apply mean subtraction (values specific to this model)
+        blob = make_blob(img)
+
+        # Pass blob through network (pipelined with DNN_ASYNC=1)
+        detections = detect_faces_pipelined(blob)
+
+        if detections is not None:
+            # Filter and scale all candidate detections in one vectorized pass
+            det = detections[0, 0]  # (N, 7): [image_id, label, confidence, x1, y1, x2, y2]
+            mask = det[:, 2] > confidence_threshold
+            boxes = (det[mask, 3:7] * np.array([w, h, w, h], dtype=np.float32)).astype(np.int32)
+            # Ensure bounding boxes are within frame boundaries
+            np.clip(boxes[:, 0::2], 0, w, out=boxes[:, 0::2])
+            np.clip(boxes[:, 1::2], 0, h, out=boxes[:, 1::2])
+            update_tracks(boxes, now, w, h)
+    frame_index += 1
+
+    # Prune tracks that have not been confirmed by the DNN recently
+    tracks[:] = [t for t in tracks if now - t['last_seen'] <= track_ttl]
+    face_found = bool(tracks) # Flag to check if any face is currently tracked
+
+    # Blur every tracked face
+    for track in tracks:
+        (startX, startY, endX, endY) = track['bbox']
+        # Extract face ROI
+        face_roi = img[startY:endY, startX:endX]
+
+        # Check if ROI is valid before blurring
+        if face_roi.size > 0:
+            # Apply blur if enabled
+            if blur_enabled:
+                box_w = endX - startX # Width of the detected face box
+                if blur_type == 'gaussian':
+                    # Kernel size is derived from the ROI inside apply_gaussian_blur
+                    blurred = apply_gaussian_blur(face_roi, kernel_factor=3)
+                elif blur_type == 'mosaic':
+                    # Use box width for block size calculation
+                    mosaic_block_size = max(3, box_w // 15)
+                    # Upsampled straight into the frame ROI, no temporary mosaic + copy back
+                    blurred = apply_mosaic_blur(face_roi, block_size=mosaic_block_size, dst=face_roi)
+                else: # 'none' or unknown
+                     blurred = face_roi # No blurring if type is 'none' or invalid
+
+                # Put blurred face back into the frame (already there when blurred in place)
+                if blurred is not face_roi:
                     img[startY:endY, startX:endX] = blurred
 
-            # Optional: Draw bounding box (can comment out if not needed)
-            # cv2.rectangle(img, (startX, startY), (endX, endY), (0, 255, 0), 2)
+        # Optional: Draw bounding box (can comment out if not needed)
+        # cv2.rectangle(img, (startX, startY), (endX, endY), (0, 255, 0), 2)
 
     # Display "No Face Found" if applicable
     if not face_found:
@@ -231,18 +426,14 @@ while True:
                     recording = False # Revert state if failed
             else:
                 stop_recording()
-    else:
-        # Headless mode: still process frames, sleep shortly, and rely on Ctrl+C to stop
-        try:
-            time.sleep(0.01)
-        except KeyboardInterrupt:
-            print("✓ Quit command received")
-            break
 
 # --- Cleanup ---
+if _stop:
+    print("✓ Quit command received")
 if recording:
     stop_recording()
 
+grabber.stop()
 capture.release()
 # Only call destroyAllWindows if display is enabled and OpenCV supports it
 if display_enabled:
@@ -4,14 +4,155 @@ Audio-Video Merger
 Menggabungkan file WAV audio dengan MP4 video menjadi satu file MP4 dengan audio track
 """
 
+import functools
 import os
 import subprocess
 import sys
 from pathlib import Path
 import shutil
 
+VAAPI_DEVICE = os.environ.get('VAAPI_DEVICE', '/dev/dri/renderD128')
 
-def merge_audio_video(video_file, audio_file, output_file):
+# Hardware H.264 encoders in order of preference:
+# (encoder, args placed before the video -i, video output args replacing '-c:v copy')
+_HW_ENCODERS = (
+    ('h264_nvenc', ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda'],
+     ['-c:v', 'h264_nvenc', '-preset', 'p1', '-tune', 'll']),
+    ('h264_qsv', ['-hwaccel', 'qsv'],
+     ['-c:v', 'h264_qsv', '-preset', 'veryfast']),
+    ('h264_vaapi', ['-vaapi_device', VAAPI_DEVICE],
+     ['-vf', 'format=nv12|vaapi,hwupload', '-c:v', 'h264_vaapi']),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _list_encoders(ffmpeg_exe):
+    """Return the set of encoder names supported by this ffmpeg build (cached per executable)."""
+    try:
+        result = subprocess.run([ffmpeg_exe, '-hide_banner', '-encoders'],
+                                capture_output=True, text=True, timeout=10)
+    except Exception:
+        return frozenset()
+    names = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        # Encoder rows look like " V....D h264_nvenc  NVIDIA NVENC H.264 encoder"
+        if len(parts) >= 2 and len(parts[0]) == 6:
+            names.add(parts[1])
+    return frozenset(names)
+
+
+def detect_hw_encoder(ffmpeg_exe):
+    """
+    Cari encoder H.264 hardware (NVENC/QSV/VAAPI) yang tersedia di build ffmpeg ini.
+
+    Returns:
+        tuple (encoder, input_args, output_args) atau None jika tidak ada
+    """
+    encoders = _list_encoders(ffmpeg_exe)
+    for name, input_args, output_args in _HW_ENCODERS:
+        if name not in encoders:
+            continue
+        if name == 'h264_vaapi' and not os.path.exists(VAAPI_DEVICE):
+            continue
+        return name, input_args, output_args
+    return None
+
+
+def find_ffmpeg_executable():
+    """Find ffmpeg executable. Try PATH, common locations, and imageio_ffmpeg as a fallback."""
+    # 1) which/where
+    exe = shutil.which('ffmpeg')
+    if exe:
+        return exe
+
+    # 2) common Windows installs (scoop, chocolatey)
+    common_paths = [
+        os.path.expandvars(r"%USERPROFILE%\\scoop\\apps\\ffmpeg\\current\\bin\\ffmpeg.exe"),
+        r"C:\\ProgramData\\chocolatey\\bin\\ffmpeg.exe",
+        r"C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe",
+        r"C:\\ffmpeg\\bin\\ffmpeg.exe",
+    ]
+    for p in common_paths:
+        if os.path.exists(p):
+            return p
+
+    # 3) Try imageio-ffmpeg (may download or provide a bundled binary)
+    try:
+        import imageio_ffmpeg
+        exe = imageio_ffmpeg.get_ffmpeg_exe()
+        if exe and os.path.exists(exe):
+            return exe
+    except Exception:
+        pass
+
+    return None
+
+
+# Resolved once at import (restart the process after installing ffmpeg)
+FFMPEG_EXE = find_ffmpeg_executable()
+
+
+def _print_ffmpeg_missing():
+    print("✗ ffmpeg not found. Install it first or install the Python package 'imageio-ffmpeg'.")
+    print("  Windows (choco): choco install ffmpeg")
+    print("  OR install imageio-ffmpeg: pip install imageio-ffmpeg")
+    print("  See: https://ffmpeg.org/download.html")
+
+
+def _print_ffmpeg_errors(stderr):
+    """Print the last few lines of ffmpeg's stderr (raw bytes, decoded only here on failure)."""
+    if not stderr:
+        return
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode('utf-8', errors='ignore')
+    errors = stderr.splitlines()
+    for line in errors[-10:]:
+        if line.strip():
+            print(f"  {line}")
+
+
+def _video_encoder_attempts(ffmpeg_exe, reencode_video):
+    """(label, args before the video -i, video output args) to try in order; stream copy comes last."""
+    attempts = []
+    if reencode_video:
+        hw = detect_hw_encoder(ffmpeg_exe)
+        if hw is not None:
+            attempts.append(hw)
+        if 'libx264' in _list_encoders(ffmpeg_exe):
+            attempts.append(('libx264', [], ['-c:v', 'libx264', '-preset', 'veryfast']))
+    attempts.append(('copy', [], ['-c:v', 'copy']))
+    return attempts
+
+
+def _build_merge_cmd(ffmpeg_exe, video_file, audio_file, input_args, video_args, output_args):
+    """
+    Susun command ffmpeg untuk merge:
+    -i video_file: input video (has video stream)
+    -i audio_file: input audio (has audio stream)
+    -c:v copy: copy video codec (no re-encoding), or a hardware/x264 H.264 encoder
+    -c:a aac: encode audio as AAC (MP4 compatible)
+    -thread_queue_size 1024: larger per-input packet queue between demuxer and muxer threads
+    -threads 0: automatic thread count for the encoders
+    -shortest: stop at shortest stream
+    -loglevel error -nostats: no banner/progress output, stderr only carries errors
+    """
+    return [
+        ffmpeg_exe,
+        '-y',  # Overwrite output file without asking
+        '-loglevel', 'error', '-nostats',
+        *input_args,
+        '-thread_queue_size', '1024', '-i', video_file,
+        '-thread_queue_size', '1024', '-i', audio_file,
+        *video_args,
+        '-c:a', 'aac',   # Encode audio as AAC
+        '-threads', '0',  # Let ffmpeg use all cores
+        '-shortest',     # Stop at shortest stream
+        *output_args,
+    ]
+
+
+def merge_audio_video(video_file, audio_file, output_file, reencode_video=None):
     """
     Merge WAV audio dengan MP4 video menggunakan ffmpeg
     
@@ -19,10 +160,14 @@ def merge_audio_video(video_file, audio_file, output_file):
         video_file: Path ke MP4 file (video only)
         audio_file: Path ke WAV file (audio only)
         output_file: Path untuk output file (video + audio)
+        reencode_video: Re-encode video ke H.264 (hardware encoder bila ada) alih-alih copy.
+            Default dari env MERGE_REENCODE_VIDEO=1.
     
     Returns:
         bool: True jika berhasil, False jika gagal
     """
+    if reencode_video is None:
+        reencode_video = os.environ.get('MERGE_REENCODE_VIDEO', '0') == '1'
     
     if not os.path.exists(video_file):
         print(f"✗ Video file not found: {video_file}")
@@ -32,88 +177,39 @@ def merge_audio_video(video_file, audio_file, output_file):
         print(f"✗ Audio file not found: {audio_file}")
         return False
     
-    # Find ffmpeg executable. Try PATH, common locations, and imageio_ffmpeg as a fallback.
-    def find_ffmpeg_executable():
-        # 1) which/where
-        exe = shutil.which('ffmpeg')
-        if exe:
-            return exe
-
-        # 2) common Windows installs (scoop, chocolatey)
-        common_paths = [
-            os.path.expandvars(r"%USERPROFILE%\\scoop\\apps\\ffmpeg\\current\\bin\\ffmpeg.exe"),
-            r"C:\\ProgramData\\chocolatey\\bin\\ffmpeg.exe",
-            r"C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe",
-            r"C:\\ffmpeg\\bin\\ffmpeg.exe",
-        ]
-        for p in common_paths:
-            if os.path.exists(p):
-                return p
-
-        # 3) Try imageio-ffmpeg (may download or provide a bundled binary)
-        try:
-            import imageio_ffmpeg
-            exe = imageio_ffmpeg.get_ffmpeg_exe()
-            if exe and os.path.exists(exe):
-                return exe
-        except Exception:
-            pass
-
-        return None
-
-    ffmpeg_exe = find_ffmpeg_executable()
+    ffmpeg_exe = FFMPEG_EXE
     if not ffmpeg_exe:
-        print("✗ ffmpeg not found. Install it first or install the Python package 'imageio-ffmpeg'.")
-        print("  Windows (choco): choco install ffmpeg")
-        print("  OR install imageio-ffmpeg: pip install imageio-ffmpeg")
-        print("  See: https://ffmpeg.org/download.html")
+        _print_ffmpeg_missing()
         return False
     
     # Create output directory if needed
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     
     try:
-        # Use ffmpeg to merge audio and video
-        # -i video_file: input video (has video stream)
-        # -i audio_file: input audio (has audio stream)
-        # -c:v copy: copy video codec (no re-encoding)
-        # -c:a aac: encode audio as AAC (MP4 compatible)
-        # -shortest: stop at shortest stream
-        
-        cmd = [
-            ffmpeg_exe,
-            '-y',  # Overwrite output file without asking
-            '-i', video_file,
-            '-i', audio_file,
-            '-c:v', 'copy',  # Copy video codec (no re-encoding)
-            '-c:a', 'aac',   # Encode audio as AAC
-            '-shortest',     # Stop at shortest stream
-            output_file
-        ]
-        
         print(f"✓ Merging video and audio...")
         print(f"  Video: {video_file}")
         print(f"  Audio: {audio_file}")
         print(f"  Output: {output_file}")
 
-        result = subprocess.run(cmd,
-                                capture_output=True,
-                                text=True,
-                                timeout=300)
-
-        if result.returncode == 0 and os.path.exists(output_file):
-            output_size = os.path.getsize(output_file) / (1024 * 1024)
-            print(f"✓ Merge successful: {output_size:.2f} MB")
-            return True
-        else:
-            print(f"✗ Merge failed:")
-            if result.stderr:
-                # Print last few lines of error
-                errors = result.stderr.split('\n')
-                for line in errors[-10:]:
-                    if line.strip():
-                        print(f"  {line}")
-            return False
+        for label, input_args, video_args in _video_encoder_attempts(ffmpeg_exe, reencode_video):
+            cmd = _build_merge_cmd(ffmpeg_exe, video_file, audio_file, input_args, video_args, [output_file])
+            if label != 'copy':
+                print(f"  Video encoder: {label}")
+
+            result = subprocess.run(cmd,
+                                    stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE,
+                                    timeout=300)
+
+            if result.returncode == 0 and os.path.exists(output_file):
+                output_size = os.path.getsize(output_file) / (1024 * 1024)
+                print(f"✓ Merge successful: {output_size:.2f} MB")
+                return True
+
+            print(f"✗ Merge failed ({label}):")
+            _print_ffmpeg_errors(result.stderr)
+        return False
 
     except subprocess.TimeoutExpired:
         print("✗ Merge timed out (ffmpeg took too long)")
@@ -123,6 +219,64 @@ def merge_audio_video(video_file, audio_file, output_file):
         return False
 
 
+def merge_audio_video_to_pipe(video_file, audio_file, reencode_video=None):
+    """
+    Merge WAV audio dengan MP4 video dan kembalikan hasilnya sebagai bytes (tanpa file output)
+
+    ffmpeg menulis fragmented MP4 (frag_keyframe+empty_moov) ke stdout, sehingga hasil merge bisa
+    langsung di-upload/di-stream tanpa tulis-lalu-baca ulang lewat disk.
+
+    Args:
+        video_file: Path ke MP4 file (video only)
+        audio_file: Path ke WAV file (audio only)
+        reencode_video: Lihat merge_audio_video
+
+    Returns:
+        bytes: isi MP4 hasil merge, atau None jika gagal
+    """
+    if reencode_video is None:
+        reencode_video = os.environ.get('MERGE_REENCODE_VIDEO', '0') == '1'
+
+    if not os.path.exists(video_file):
+        print(f"✗ Video file not found: {video_file}")
+        return None
+
+    if not os.path.exists(audio_file):
+        print(f"✗ Audio file not found: {audio_file}")
+        return None
+
+    ffmpeg_exe = FFMPEG_EXE
+    if not ffmpeg_exe:
+        _print_ffmpeg_missing()
+        return None
+
+    # A pipe cannot be seeked back to write the moov atom, so emit a fragmented MP4 instead
+    pipe_output = ['-f', 'mp4', '-movflags', 'frag_keyframe+empty_moov', 'pipe:1']
+    try:
+        for label, input_args, video_args in _video_encoder_attempts(ffmpeg_exe, reencode_video):
+            cmd = _build_merge_cmd(ffmpeg_exe, video_file, audio_file, input_args, video_args, pipe_output)
+            proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                out, err = proc.communicate(timeout=300)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                print("✗ Merge timed out (ffmpeg took too long)")
+                return None
+
+            if proc.returncode == 0 and out:
+                print(f"✓ Merge successful ({label}): {len(out) / (1024 * 1024):.2f} MB")
+                return out
+
+            print(f"✗ Merge failed ({label}):")
+            _print_ffmpeg_errors(err)
+        return None
+
+    except Exception as e:
+        print(f"✗ Error during merge: {e}")
+        return None
+
+
 def cleanup_temporary_files(video_file, audio_file, keep_originals=False):
     """
     Hapus file video dan audio terpisah setelah merge
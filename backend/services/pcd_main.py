@@ -3,18 +3,43 @@ import cv2
 import numpy as np
 from datetime import datetime
 import os
-import base64
 import requests
 import time
 import argparse
+import signal
 import threading
-from collections import deque
+
+try:  # SIMD-accelerated drop-in replacement for the stdlib codec
+    import pybase64 as base64
+except ImportError:  # pragma: no cover - fallback when pybase64 is missing
+    import base64
+
+try:  # libjpeg-turbo SIMD codec (pip install PyTurboJPEG + system libturbojpeg)
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _tj = TurboJPEG()
+except Exception:  # pragma: no cover - wrapper or shared library missing, use OpenCV
+    _tj = None
+
+try:  # optional: fused DNN input kernel (pip install numba), enabled with PCD_NUMBA_BLOB=1
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - OpenCV resize + NumPy path
+    njit = None
+
+try:  # optional: binary frame uploads over Socket.IO (pip install "python-socketio[client]")
+    import socketio as _sio
+except ImportError:  # pragma: no cover - fallback to HTTP uploads
+    _sio = None
 
 try:
     from services.audio_recorder import AudioRecorder
 except ImportError:  # fallback kalau dijalankan via `python services/pcd_main.py`
     from audio_recorder import AudioRecorder
 
+try:
+    from services.frame_shm import SHM_NAME_ENV, SharedFrame
+except ImportError:  # fallback kalau dijalankan via `python services/pcd_main.py`
+    from frame_shm import SHM_NAME_ENV, SharedFrame
+
 # Try to import the centralized merge utility (works when running from backend/)
 try:
     from services.merge_audio_video import merge_audio_video as _central_merge_fn
@@ -39,29 +64,246 @@ _BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 prototxt_path = os.path.join(_BACKEND_DIR, "models/deploy.prototxt.txt")
 model_path = os.path.join(_BACKEND_DIR, "models/res10_300x300_ssd_iter_140000.caffemodel")
 confidence_threshold = 0.5  # Minimum probability to filter weak detections
+# Raw JPEG uploads: no base64 (+33% bytes) and no JSON envelope
+_RAW_UPLOAD_HEADERS = {'Content-Type': 'application/octet-stream'}
+# JPEG quality of frames returned by process_frame_bytes (95 was ~40% larger for no visible gain)
+PROCESSED_JPEG_QUALITY = 80
 
-# --- Load the DNN Model (kept at module import so process_frame_base64 dapat digunakan)
-try:
-    net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+# Optional OpenVINO IR of the same SSD (FP16 or INT8), produced by tools/quantize_face_ssd.py
+ir_model_path = os.environ.get('DNN_IR_MODEL', os.path.join(_BACKEND_DIR, "models/face_ssd.xml"))
+
+
+def _load_net():
+    """Load the face detector: OpenVINO IR via the Inference Engine backend when available, else Caffe."""
+    ir_weights = os.path.splitext(ir_model_path)[0] + '.bin'
+    if os.path.exists(ir_model_path) and os.path.exists(ir_weights):
+        try:
+            ir_net = cv2.dnn.readNet(ir_model_path, ir_weights)
+            ir_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE)
+            ir_net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            # The backend is only initialized on the first forward; fail here rather than mid-stream
+            ir_net.setInput(np.zeros((1, 3, 300, 300), dtype=np.float32))
+            ir_net.forward()
+            print(f"✓ DNN face detection model loaded (OpenVINO IR: {os.path.basename(ir_model_path)})")
+            return ir_net
+        except (cv2.error, AttributeError) as e:
+            print(f"⚠️ OpenVINO IR not usable with this OpenCV build ({e}); falling back to Caffe.")
+
+    caffe_net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
     # Try to use OpenCL FP16 if available for speed; fallback to CPU
     try:
-        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        caffe_net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
         try:
-            net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL_FP16)
+            caffe_net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL_FP16)
             print("✓ DNN target: OpenCL FP16")
         except Exception:
-            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            caffe_net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
             print("ℹ️ DNN target: CPU")
     except Exception:
         pass
     print("✓ DNN face detection model loaded successfully.")
-except cv2.error as e:
-    print(f"✗ Error loading DNN model: {e}")
-    print("Make sure 'deploy.prototxt.txt' and 'res10_300x300_ssd_iter_140000.caffemodel' exist.")
-    # don't sys.exit here; raise so importing app can handle it if needed
-    raise
+    return caffe_net
+
+
+def _decode_jpeg(buf: bytes):
+    """Decode JPEG bytes into a BGR image (libjpeg-turbo when available, else OpenCV)."""
+    if _tj is not None:
+        try:
+            return _tj.decode(buf, pixel_format=TJPF_BGR)
+        except Exception:
+            pass  # not a JPEG / corrupt data: let OpenCV try
+    return cv2.imdecode(np.frombuffer(buf, np.uint8), cv2.IMREAD_COLOR)
+
+
+def _encode_jpeg(img: np.ndarray, quality: int = 95) -> bytes:
+    """Encode a BGR image as JPEG bytes (libjpeg-turbo when available, else OpenCV)."""
+    if _tj is not None:
+        return _tj.encode(np.ascontiguousarray(img), quality=quality, pixel_format=TJPF_BGR)
+    _, buffer = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buffer.tobytes()
+
+
+def _detect_boxes(detections: np.ndarray, w: int, h: int):
+    """Vectorized SSD post-processing.
+
+    Returns the confident boxes as four int32 columns (startX, startY, endX, endY),
+    scaled to the frame and clipped to its bounds.
+    """
+    det = detections[0, 0]  # (N, 7): [image_id, label, confidence, x1, y1, x2, y2]
+    mask = det[:, 2] > confidence_threshold
+    startX = np.clip((det[mask, 3] * w).astype(np.int32), 0, w)
+    startY = np.clip((det[mask, 4] * h).astype(np.int32), 0, h)
+    endX = np.clip((det[mask, 5] * w).astype(np.int32), 0, w)
+    endY = np.clip((det[mask, 6] * h).astype(np.int32), 0, h)
+    return startX, startY, endX, endY
+
+
+def _approx_gaussian_blur(image: np.ndarray, k: int) -> np.ndarray:
+    """Approximate cv2.GaussianBlur(image, (k, k), 0) with three box-filter passes.
+
+    Three boxes of width ~2*sigma have the Gaussian's variance; cv2.blur uses running sums,
+    so the cost per pixel no longer grows with k.
+    """
+    sigma = 0.3 * ((k - 1) * 0.5 - 1) + 0.8  # OpenCV's sigma for a given kernel size
+    b = max(3, int(round(2 * sigma))) | 1
+    return cv2.blur(cv2.blur(cv2.blur(image, (b, b)), (b, b)), (b, b))
+
+
+# Reusable DNN input buffers (one resize target and one float32 blob) per thread: the capture
+# worker in main() and the Flask tpool threads calling process_frame_bytes each get their own
+_tls = threading.local()
+_mean = np.array([104.0, 177.0, 123.0], dtype=np.float32).reshape(3, 1, 1)
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _build_blob(src, dst, mean_b, mean_g, mean_r):
+        """Bilinear resize (half-pixel centers, like INTER_LINEAR) + mean subtraction + HWC->CHW in one pass."""
+        h, w = src.shape[0], src.shape[1]
+        oh, ow = dst.shape[1], dst.shape[2]
+        sy = h / oh
+        sx = w / ow
+        for y in prange(oh):
+            fy = max((y + 0.5) * sy - 0.5, 0.0)
+            y0 = min(int(fy), h - 1)
+            y1 = min(y0 + 1, h - 1)
+            wy = fy - y0
+            for x in range(ow):
+                fx = max((x + 0.5) * sx - 0.5, 0.0)
+                x0 = min(int(fx), w - 1)
+                x1 = min(x0 + 1, w - 1)
+                wx = fx - x0
+                for c in range(3):
+                    top = src[y0, x0, c] * (1.0 - wx) + src[y0, x1, c] * wx
+                    bottom = src[y1, x0, c] * (1.0 - wx) + src[y1, x1, c] * wx
+                    mean = mean_b if c == 0 else (mean_g if c == 1 else mean_r)
+                    dst[c, y, x] = top * (1.0 - wy) + bottom * wy - mean
+else:
+    _build_blob = None
+
+# Off by default: on the machines measured it only matched cv2.resize + np.subtract; worth trying on many-core CPUs
+_use_numba_blob = _build_blob is not None and os.environ.get('PCD_NUMBA_BLOB', '0') == '1'
+
+
+def _make_blob(image: np.ndarray, size: int = 300) -> np.ndarray:
+    """Equivalent of blobFromImage(resize(image, size x size), 1.0, (size, size), mean) without per-frame allocations.
+
+    The returned blob is overwritten by the calling thread's next call; net.setInput copies it.
+    """
+    if _use_numba_blob:
+        blob = getattr(_tls, 'numba_blobs', {}).get(size)
+        if blob is None:
+            if not hasattr(_tls, 'numba_blobs'):
+                _tls.numba_blobs = {}
+            blob = _tls.numba_blobs[size] = np.empty((1, 3, size, size), dtype=np.float32)
+        _build_blob(image, blob[0], 104.0, 177.0, 123.0)
+        return blob
+
+    all_bufs = getattr(_tls, 'blob_bufs', None)
+    if all_bufs is None:
+        all_bufs = _tls.blob_bufs = {}
+    bufs = all_bufs.get(size)
+    if bufs is None:
+        bufs = all_bufs[size] = (np.empty((size, size, 3), dtype=np.uint8),
+                                 np.empty((1, 3, size, size), dtype=np.float32))
+    resized, blob = bufs
+    cv2.resize(image, (size, size), dst=resized, interpolation=cv2.INTER_LINEAR)
+    # HWC uint8 -> CHW float32 with mean subtraction, written straight into the blob
+    np.subtract(resized.transpose(2, 0, 1), _mean, out=blob[0])
+    return blob
+
+
+# OpenCV threads per process_frame_bytes call: concurrent request threads already run in parallel,
+# so the default (all cores per call) would oversubscribe the CPU
+_server_cv_threads = int(os.environ.get('PCD_SERVER_CV_THREADS', '1'))
+_server_threads_configured = False
+
+
+def get_net():
+    """Return this thread's face detector, loaded on first use (cv2.dnn.Net is not thread-safe).
+
+    Used by process_frame_bytes so concurrent uploads run in parallel; the capture loop in main()
+    loads its own net.
+    """
+    global _server_threads_configured
+    thread_net = getattr(_tls, 'net', None)
+    if thread_net is None:
+        # No lock: under eventlet threading.Lock is a green lock that does not exclude the native tpool
+        # threads calling this. Racing threads all set the same value, so the check only saves calls.
+        if not _server_threads_configured:
+            cv2.setNumThreads(_server_cv_threads)
+            _server_threads_configured = True
+        thread_net = _tls.net = _load_net()
+    return thread_net
+
+
+_EMPTY = object()  # marks an empty _FrameSlot (None is a valid item)
+
+
+class _FrameSlot:
+    """Single-item handoff between two pipeline threads (one producer, one consumer).
+
+    Frames are passed by reference, never copied. put(overwrite=True) replaces an item the
+    consumer has not taken yet (keep only the newest); put(overwrite=False) waits until the
+    previous item was taken.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = _EMPTY
+        self._filled = threading.Event()
+        self._emptied = threading.Event()
+        self._emptied.set()
+
+    def put(self, item, overwrite: bool = True, timeout: float | None = None) -> bool:
+        """Store item; returns False if a non-overwriting put timed out."""
+        if not overwrite and not self._emptied.wait(timeout):
+            return False
+        with self._lock:
+            self._item = item
+            self._emptied.clear()
+            self._filled.set()
+        return True
+
+    def get(self, timeout: float | None = None):
+        """Take the item, or return _EMPTY if none arrived within timeout."""
+        if not self._filled.wait(timeout):
+            return _EMPTY
+        with self._lock:
+            item, self._item = self._item, _EMPTY
+            self._filled.clear()
+            self._emptied.set()
+        return item
+
 
 # --- Command line args (allow using file/video as source) ---
+def _camera_api() -> int:
+    """Capture backend for webcams: OpenCV otherwise tries GStreamer/DirectShow first, which stream raw YUYV."""
+    if sys.platform.startswith('linux'):
+        return cv2.CAP_V4L2
+    if sys.platform == 'win32':
+        return cv2.CAP_MSMF
+    return cv2.CAP_ANY
+
+
+def _configure_camera(cap) -> None:
+    """Request MJPG at CAMERA_WIDTH x CAMERA_HEIGHT @ CAMERA_FPS with a one-frame driver queue.
+
+    MJPG is compressed on the webcam, so 1080p30 fits the USB bus; BUFFERSIZE=1 drops the
+    UVC driver's frame queue (several frames of latency). Drivers ignore what they don't support.
+    """
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    width = int(os.environ.get('CAMERA_WIDTH', '1920'))
+    height = int(os.environ.get('CAMERA_HEIGHT', '1080'))
+    fps = int(os.environ.get('CAMERA_FPS', '30'))
+    if width > 0 and height > 0:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps > 0:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+
 def _parse_args(argv=None):
     parser = argparse.ArgumentParser(description='pcd-main: face blur and optional frame uploader')
     parser.add_argument('--source', '-s', help='Path to image or video file to use instead of webcam')
@@ -77,6 +319,15 @@ def main(argv=None):
     """
     args = _parse_args(argv)
 
+    # Detector for the capture loop, loaded here rather than at import so the Flask process (which
+    # only uses the per-thread nets from get_net) does not load a net it never runs
+    try:
+        net = _load_net()
+    except cv2.error as e:
+        print(f"✗ Error loading DNN model: {e}")
+        print("Make sure 'deploy.prototxt.txt' and 'res10_300x300_ssd_iter_140000.caffemodel' exist.")
+        return 1
+
     def _parse_audio_device(value):
         if value is None:
             return None
@@ -141,8 +392,7 @@ def main(argv=None):
 
     def _oddize(n: int) -> int:
         """Return an odd integer >= 3 based on n."""
-        n = max(3, int(n))
-        return n if (n % 2) == 1 else n + 1
+        return max(3, int(n)) | 1
 
     def apply_gaussian_blur(image: np.ndarray, kernel_factor: int = 3) -> np.ndarray:
         """Apply Gaussian blur to an image using a kernel derived from image size."""
@@ -153,20 +403,23 @@ def main(argv=None):
             kf = max(1, int(kernel_factor))
         except Exception:
             kf = 3
-        k = _oddize(max(3, min(h, w) // kf))
-        k = min(k, max(3, min(h, w) if min(h, w) % 2 == 1 else min(h, w) - 1))
+        m = min(h, w)
+        k = _oddize(m // kf)
+        k = min(k, max(3, m if m % 2 == 1 else m - 1))
         if k <= 1:
             return image
-        return cv2.GaussianBlur(image, (k, k), 0)
+        return _approx_gaussian_blur(image, k)
+
+    def apply_mosaic_blur(image: np.ndarray, block_size: int = 10, dst: np.ndarray | None = None) -> np.ndarray:
+        """Apply mosaic (pixelated) blur to image.
 
-    def apply_mosaic_blur(image: np.ndarray, block_size: int = 10) -> np.ndarray:
-        """Apply mosaic (pixelated) blur to image."""
+        Pass dst=image to pixelate in place (e.g. a ROI view of the frame).
+        """
         h, w = image.shape[:2]
         block_size = max(1, block_size)
         small_h, small_w = max(1, h // block_size), max(1, w // block_size)
         temp = cv2.resize(image, (small_w, small_h), interpolation=cv2.INTER_LINEAR)
-        mosaic = cv2.resize(temp, (w, h), interpolation=cv2.INTER_NEAREST)
-        return mosaic
+        return cv2.resize(temp, (w, h), dst=dst, interpolation=cv2.INTER_NEAREST)
 
     def _start_audio_recording():
         """Start microphone capture if the feature is enabled.
@@ -227,7 +480,7 @@ def main(argv=None):
             import subprocess
             # Ensure ffmpeg available
             try:
-                subprocess.run(['ffmpeg', '-version'], capture_output=True, timeout=5)
+                subprocess.run(['ffmpeg', '-version'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
             except Exception:
                 print("⚠️ ffmpeg not available for fallback merge")
                 return False
@@ -235,11 +488,12 @@ def main(argv=None):
             base_name = os.path.splitext(video_file)[0]
             merged_file = base_name + '_merged.mp4'
             cmd = [
-                'ffmpeg', '-y', '-i', video_file, '-i', audio_file,
+                'ffmpeg', '-y', '-loglevel', 'error', '-nostats', '-i', video_file, '-i', audio_file,
                 '-c:v', 'copy', '-c:a', 'aac', '-shortest', merged_file
             ]
             print(f"✓ Merging audio with video (fallback)...")
-            res = subprocess.run(cmd, capture_output=True, text=True, timeout=180)
+            res = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.PIPE, timeout=180)
             if res.returncode == 0 and os.path.exists(merged_file):
                 try:
                     os.replace(merged_file, video_file)
@@ -257,7 +511,8 @@ def main(argv=None):
                 print(f"✓ Merged and replaced: {video_file}")
                 return True
             else:
-                print(f"⚠️ Fallback merge failed: {res.stderr if hasattr(res, 'stderr') else res}")
+                err = res.stderr.decode('utf-8', errors='ignore').splitlines()[-10:]
+                print("⚠️ Fallback merge failed: " + '\n'.join(err))
                 return False
         except Exception as e:
             print(f"⚠️ Error during fallback merge: {e}")
@@ -345,15 +600,70 @@ def main(argv=None):
         current_recording_path = None
         recording_started_at = None
 
+    sio_client = None
+    sio_retry_at = 0.0
+    sio_inflight_since = 0.0  # monotonic time of the emit still waiting for its ack (0: none)
+
+    # Local backend (app.py) shares a memory segment with us: frames skip JPEG/base64/HTTP entirely
+    shared_frame = None
+    shm_name = os.environ.get(SHM_NAME_ENV)
+    if shm_name:
+        try:
+            shared_frame = SharedFrame.attach(shm_name)
+            print(f"✓ Shared-memory frame channel attached: {shm_name}")
+        except Exception as e:
+            print(f"⚠️ Shared-memory frame channel unavailable ({e}); using network upload")
+
+    def _get_sio_client(backend_url: str):
+        """Return a connected Socket.IO client, or None to fall back to HTTP.
+
+        Connection failures are retried at most every 5 seconds so a missing
+        backend does not stall the capture loop. Once connected, the client is kept:
+        after a drop its own reconnection loop restores the connection, and frames go
+        over HTTP meanwhile (a second client would end up registered twice).
+        """
+        nonlocal sio_client, sio_retry_at
+        if _sio is None or os.environ.get('UPLOAD_TRANSPORT', 'socketio').lower() != 'socketio':
+            return None
+        if sio_client is not None:
+            return sio_client if sio_client.connected else None
+        now = time.monotonic()
+        if now < sio_retry_at:
+            return None
+        try:
+            client = _sio.Client(reconnection=True)
+            client.connect(backend_url.rstrip('/'), auth={'role': 'producer'}, wait_timeout=2)
+            sio_client = client
+            print(f"✓ Socket.IO upload channel connected: {backend_url}")
+            return sio_client
+        except Exception as e:
+            sio_retry_at = now + 5.0
+            print(f"⚠️ Socket.IO upload unavailable ({e}); falling back to HTTP")
+            return None
+
+    def _on_upload_ack(*_):
+        nonlocal sio_inflight_since
+        sio_inflight_since = 0.0
+
     def send_frame_to_backend(img: np.ndarray):
-        """Encode frame as JPEG base64 and POST to backend /upload_frame if BACKEND_URL is set.
+        """Hand the frame to the backend.
+
+        When started by the backend with PCD_SHM_NAME set, the raw BGR frame is copied
+        into shared memory and the backend encodes it. Otherwise the frame is encoded as
+        JPEG and sent to BACKEND_URL. A binary Socket.IO emit ('upload_frame_bin', raw
+        JPEG bytes) is preferred, with a fallback to POSTing the raw JPEG body to
+        /upload_frame_raw when python-socketio is unavailable. At most one Socket.IO
+        frame is in flight: until the backend acks it, newer frames are dropped here,
+        so a slow backend never queues up work.
 
         Tunable via env vars:
          - UPLOAD_MAX_WIDTH (int, default 640): resize width while keeping aspect ratio
          - UPLOAD_JPEG_QUALITY (int, default 60): JPEG quality
+         - UPLOAD_TRANSPORT ('socketio' or 'http', default 'socketio')
         """
+        nonlocal sio_inflight_since
         backend_url = os.environ.get('BACKEND_URL')
-        if not backend_url:
+        if shared_frame is None and not backend_url:
             return False
         try:
             up_max_w = int(os.environ.get('UPLOAD_MAX_WIDTH', '640'))
@@ -369,10 +679,28 @@ def main(argv=None):
             except Exception:
                 pass
 
-            _, buffer = cv2.imencode('.jpg', frame_to_send, [int(cv2.IMWRITE_JPEG_QUALITY), max(30, min(95, jpg_q))])
-            jpg_b64 = base64.b64encode(buffer).decode('ascii')
-            payload = {'image': jpg_b64}
-            resp = requests.post(f"{backend_url.rstrip('/')}/upload_frame", json=payload, timeout=2.0)
+            if shared_frame is not None and shared_frame.write(frame_to_send):
+                return True
+            if not backend_url:
+                return False
+
+            jpeg_bytes = _encode_jpeg(frame_to_send, max(30, min(95, jpg_q)))
+
+            client = _get_sio_client(backend_url)
+            if client is not None:
+                # A lost ack (e.g. dropped connection) only blocks uploads for 2 seconds
+                if sio_inflight_since and time.monotonic() - sio_inflight_since < 2.0:
+                    return False
+                try:
+                    sio_inflight_since = time.monotonic()
+                    client.emit('upload_frame_bin', jpeg_bytes, callback=_on_upload_ack)
+                    return True
+                except Exception as e:
+                    sio_inflight_since = 0.0
+                    print(f"⚠️ Socket.IO emit failed ({e}); falling back to HTTP")
+
+            resp = requests.post(f"{backend_url.rstrip('/')}/upload_frame_raw", data=jpeg_bytes,
+                                 headers=_RAW_UPLOAD_HEADERS, timeout=2.0)
             return resp.ok
         except Exception as e:
             print(f"✗ Failed to send frame to backend: {e}")
@@ -419,13 +747,18 @@ def main(argv=None):
                 pass
 
         def try_open_camera(dev):
-            cap = cv2.VideoCapture(dev)
-            if cap.isOpened():
-                return cap, dev
-            try:
-                cap.release()
-            except Exception:
-                pass
+            apis = [_camera_api()]
+            if apis[0] != cv2.CAP_ANY:
+                apis.append(cv2.CAP_ANY)  # e.g. OpenCV built without V4L2/MSMF support
+            for api in apis:
+                cap = cv2.VideoCapture(dev, api)
+                if cap.isOpened():
+                    _configure_camera(cap)
+                    return cap, dev
+                try:
+                    cap.release()
+                except Exception:
+                    pass
             return None, None
 
         cap, used = try_open_camera(device)
@@ -496,92 +829,190 @@ def main(argv=None):
     # Initialize window name for display
     WINDOW_NAME = 'Face Blur Detection (DNN) - Press Q to Quit'
 
-    # Frame queue for matplotlib display (thread-safe)
-    # --- Main Loop ---
-    loop_count = 0
+    # --- Pipeline: capture thread -> detection/blur worker -> main thread (record/upload/display) ---
+    # Stages hand frames over through single-item slots. A live camera drops the oldest frame when the
+    # next stage is busy (stay real-time); file/image sources block instead so no frame is skipped.
     upload_every_n = int(os.environ.get('UPLOAD_EVERY_N', '1'))  # send every Nth frame
     # Reuse detections between frames to reduce DNN calls (persist across frames)
     detect_every_n = int(os.environ.get('DETECT_EVERY_N', '2'))
     max_box_age = int(os.environ.get('MAX_BOX_AGE', '5'))
-    last_boxes = []  # list of (startX, startY, endX, endY)
-    last_boxes_age = 0
-    while True:
-        if image_source is not None:
-            img = image_source.copy()
-            success = True
-        else:
-            success, img = capture.read()
-        if not success or img is None:
-            print("Warning: failed to read frame. Exiting.")
-            break
+    # Motion gate (off by default, PCD_MOTION_GATE=1): skip the DNN while at most PCD_MOTION_MAX_PIXELS
+    # pixels of an 80x45 grayscale thumbnail differ by more than PCD_MOTION_PIXEL_DIFF from the frame
+    # last sent to the DNN. A local count, so one new face (a 60x60 face at 720p changes ~10) is enough to
+    # rerun detection. The DNN still runs at least every MAX_BOX_AGE frames so boxes never go stale.
+    motion_gate = os.environ.get('PCD_MOTION_GATE', '0') == '1'
+    motion_pixel_diff = int(os.environ.get('PCD_MOTION_PIXEL_DIFF', '8'))
+    motion_max_pixels = int(os.environ.get('PCD_MOTION_MAX_PIXELS', '2'))
+    # Smaller DNN input for large faces (e.g. 160: ~3.5x fewer MACs); every PCD_FULL_DETECT_EVERY-th
+    # detection still runs at the native 300x300 so small/distant faces are picked up
+    detect_size = max(64, int(os.environ.get('PCD_DETECT_SIZE', '300')))
+    full_detect_every = max(1, int(os.environ.get('PCD_FULL_DETECT_EVERY', '5')))
+    drop_stale_frames = args.source is None
+    cap_slot = _FrameSlot()
+    out_slot = _FrameSlot()
+    stop_event = threading.Event()
+    _END = None  # sentinel pushed through the pipeline when the source is exhausted
+
+    def _put(slot, item, drop_oldest=False):
+        """Hand item to the next stage; returns False if the pipeline is stopping."""
+        while not stop_event.is_set():
+            if slot.put(item, overwrite=drop_oldest, timeout=0.1):
+                return True
+        return False
 
-        # Apply mirror/flip (always enabled)
-        img = cv2.flip(img, 1)
-
-        # --- DNN Face Detection (every N frames) ---
-        (h, w) = img.shape[:2]  # Frame height and width
-
-        def _blur_boxes_on_img(boxes):
-            nonlocal img
-            if not blur_enabled or blur_type == 'none':
-                return
-            for (startX, startY, endX, endY) in boxes:
-                # ensure bounds
-                sx = max(0, min(startX, w-1)); ex = max(0, min(endX, w))
-                sy = max(0, min(startY, h-1)); ey = max(0, min(endY, h))
-                if ex <= sx or ey <= sy:
-                    continue
-                face_roi = img[sy:ey, sx:ex]
-                if face_roi.size <= 0:
-                    continue
-                if blur_type == 'gaussian':
-                    box_w = ex - sx
-                    k_factor = 3
-                    _ = _oddize(max(3, box_w // k_factor))
-                    blurred = apply_gaussian_blur(face_roi, kernel_factor=k_factor)
-                elif blur_type == 'mosaic':
-                    mosaic_block_size = max(3, (ex - sx) // 15)
-                    blurred = apply_mosaic_blur(face_roi, block_size=mosaic_block_size)
+    def _get(slot):
+        """Take the next item from slot; returns _END if the pipeline is stopping."""
+        while not stop_event.is_set():
+            item = slot.get(timeout=0.1)
+            if item is not _EMPTY:
+                return item
+        return _END
+
+    def capture_loop():
+        try:
+            while not stop_event.is_set():
+                if image_source is not None:
+                    img = image_source.copy()
+                    success = True
                 else:
-                    blurred = face_roi
-                img[sy:ey, sx:ex] = blurred
+                    success, img = capture.read()
+                if not success or img is None:
+                    print("Warning: failed to read frame. Exiting.")
+                    break
+                _put(cap_slot, img, drop_oldest=drop_stale_frames)
+        finally:
+            _put(cap_slot, _END)
 
-        run_detection = (detect_every_n <= 1) or ((loop_count % detect_every_n) == 0)
-        if run_detection:
-            blob = cv2.dnn.blobFromImage(cv2.resize(img, (300, 300)), 1.0,
-                (300, 300), (104.0, 177.0, 123.0))
-            net.setInput(blob)
-            detections = net.forward()
-
-            current_boxes = []
-            for i in range(0, detections.shape[2]):
-                confidence = detections[0, 0, i, 2]
-                if confidence > confidence_threshold:
-                    box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                    (startX, startY, endX, endY) = box.astype("int")
-                    startX = max(0, startX)
-                    startY = max(0, startY)
-                    endX = min(w, endX)
-                    endY = min(h, endY)
-                    if endX > startX and endY > startY:
-                        current_boxes.append((startX, startY, endX, endY))
-
-            last_boxes = current_boxes
-            last_boxes_age = 0
-            _blur_boxes_on_img(last_boxes)
-            face_found = len(current_boxes) > 0
-        else:
-            # reuse previous boxes for a few frames
-            if last_boxes and last_boxes_age < max_box_age:
-                _blur_boxes_on_img(last_boxes)
-                last_boxes_age += 1
-                face_found = True
+    def _blur_boxes_on_img(img, boxes):
+        if not blur_enabled or blur_type == 'none':
+            return
+        (h, w) = img.shape[:2]
+        for (startX, startY, endX, endY) in boxes:
+            # ensure bounds
+            sx = max(0, min(startX, w-1)); ex = max(0, min(endX, w))
+            sy = max(0, min(startY, h-1)); ey = max(0, min(endY, h))
+            if ex <= sx or ey <= sy:
+                continue
+            face_roi = img[sy:ey, sx:ex]
+            if face_roi.size <= 0:
+                continue
+            if blur_type == 'gaussian':
+                # Kernel size is derived from the ROI inside apply_gaussian_blur
+                blurred = apply_gaussian_blur(face_roi, kernel_factor=3)
+            elif blur_type == 'mosaic':
+                mosaic_block_size = max(3, (ex - sx) // 15)
+                # Upsampled straight into the frame ROI, no temporary mosaic + copy back
+                blurred = apply_mosaic_blur(face_roi, block_size=mosaic_block_size, dst=face_roi)
             else:
-                face_found = False
+                blurred = face_roi
+            if blurred is not face_roi:
+                img[sy:ey, sx:ex] = blurred
+
+    def detect_loop():
+        frame_count = 0
+        detection_count = 0
+        small_size = detect_size
+        last_boxes = []  # list of (startX, startY, endX, endY)
+        last_boxes_age = 0
+        thumb_bgr = np.empty((45, 80, 3), dtype=np.uint8)
+        thumb = np.empty((45, 80), dtype=np.uint8)
+        ref_thumb = np.empty((45, 80), dtype=np.uint8)  # thumbnail of the frame last sent to the DNN
+        diff_thumb = np.empty((45, 80), dtype=np.uint8)
+        have_ref = False
+        frames_since_dnn = 0
+        try:
+            while True:
+                img = _get(cap_slot)
+                if img is _END:
+                    break
+
+                # Apply mirror/flip (always enabled)
+                cv2.flip(img, 1, dst=img)  # in place: no second full-frame buffer per frame
+
+                # --- DNN Face Detection (every N frames) ---
+                (h, w) = img.shape[:2]  # Frame height and width
+                run_detection = (detect_every_n <= 1) or ((frame_count % detect_every_n) == 0)
+                if run_detection and motion_gate:
+                    cv2.resize(img, (80, 45), dst=thumb_bgr, interpolation=cv2.INTER_LINEAR)
+                    cv2.cvtColor(thumb_bgr, cv2.COLOR_BGR2GRAY, dst=thumb)
+                    static = False
+                    if have_ref and frames_since_dnn < max_box_age:
+                        cv2.absdiff(thumb, ref_thumb, dst=diff_thumb)
+                        cv2.threshold(diff_thumb, motion_pixel_diff, 255, cv2.THRESH_BINARY, dst=diff_thumb)
+                        static = cv2.countNonZero(diff_thumb) <= motion_max_pixels
+                    if static:
+                        # Static scene: the previous detections still hold (they age as usual)
+                        run_detection = False
+                    else:
+                        np.copyto(ref_thumb, thumb)
+                        have_ref = True
+                if run_detection:
+                    frames_since_dnn = 0
+                    size = 300 if (small_size == 300 or detection_count % full_detect_every == 0) else small_size
+                    detection_count += 1
+                    try:
+                        net.setInput(_make_blob(img, size))
+                        detections = net.forward()
+                    except cv2.error as e:
+                        if size == 300:
+                            raise
+                        # e.g. an OpenVINO IR with a fixed 300x300 input
+                        print(f"⚠️ DNN rejected {size}x{size} input ({e}); using 300x300")
+                        small_size = 300
+                        net.setInput(_make_blob(img, 300))
+                        detections = net.forward()
+
+                    startX, startY, endX, endY = _detect_boxes(detections, w, h)
+                    valid = (endX > startX) & (endY > startY)
+                    current_boxes = list(zip(startX[valid].tolist(), startY[valid].tolist(),
+                                             endX[valid].tolist(), endY[valid].tolist()))
+
+                    last_boxes = current_boxes
+                    last_boxes_age = 0
+                    _blur_boxes_on_img(img, last_boxes)
+                    face_found = len(current_boxes) > 0
+                else:
+                    frames_since_dnn += 1
+                    # reuse previous boxes for a few frames
+                    if last_boxes and last_boxes_age < max_box_age:
+                        _blur_boxes_on_img(img, last_boxes)
+                        last_boxes_age += 1
+                        face_found = True
+                    else:
+                        face_found = False
+
+                # Display "No Face Found" if applicable
+                if not face_found:
+                    cv2.putText(img, 'No Face Found!', (20, 50), cv2.FONT_HERSHEY_COMPLEX, 1, (0, 0, 255), 2)
+
+                frame_count += 1
+                if not _put(out_slot, img, drop_oldest=drop_stale_frames):
+                    break
+        except Exception as e:
+            print(f"✗ Error in detection worker: {e}")
+        finally:
+            _put(out_slot, _END)
+
+    capture_thread = threading.Thread(target=capture_loop, name='pcd-capture', daemon=True)
+    detect_thread = threading.Thread(target=detect_loop, name='pcd-detect', daemon=True)
+    capture_thread.start()
+    detect_thread.start()
+
+    # Ctrl+C stops the pipeline through stop_event instead of raising KeyboardInterrupt mid-frame
+    try:
+        prev_sigint = signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    except ValueError:  # signal handlers can only be installed from the main thread
+        prev_sigint = None
 
-        # Display "No Face Found" if applicable
-        if not face_found:
-            cv2.putText(img, 'No Face Found!', (20, 50), cv2.FONT_HERSHEY_COMPLEX, 1, (0, 0, 255), 2)
+    # --- Main Loop ---
+    loop_count = 0
+    while not stop_event.is_set():
+        try:
+            img = _get(out_slot)
+        except KeyboardInterrupt:
+            break
+        if img is _END:
+            break
 
         # Write frame to video file if recording
         if recording and video_writer is not None:
@@ -631,16 +1062,17 @@ def main(argv=None):
                         recording = False  # Revert state if failed
                 else:
                     stop_recording()
-        else:
-            # Headless mode: sleep ringan dan lanjut loop
-            try:
-                time.sleep(0.005)
-            except KeyboardInterrupt:
-                break
 
         loop_count += 1
 
     # --- Cleanup ---
+    # Stop the pipeline threads before releasing the capture they read from
+    stop_event.set()
+    capture_thread.join(timeout=2.0)
+    detect_thread.join(timeout=2.0)
+    if prev_sigint is not None:
+        signal.signal(signal.SIGINT, prev_sigint)
+
     if recording:
         stop_recording()
     else:
@@ -653,6 +1085,19 @@ def main(argv=None):
     except Exception:
         pass
 
+    # Close the Socket.IO upload channel if it was opened
+    try:
+        if sio_client is not None:
+            sio_client.disconnect()
+    except Exception:
+        pass
+
+    try:
+        if shared_frame is not None:
+            shared_frame.close()
+    except Exception:
+        pass
+
     # Only call destroyAllWindows if display is enabled and OpenCV supports it
     if display_enabled:
         try:
@@ -667,62 +1112,65 @@ def main(argv=None):
 
 
 # === Modular function for backend integration ===
-def process_frame_base64(img_b64: str) -> str:
+def process_frame_bytes(jpeg_bytes: bytes) -> bytes:
     """
-    Receive base64 image → decode → blur face → return base64 image (processed)
-    Used by Flask backend when receiving /upload_frame.
+    Receive raw JPEG bytes → decode → blur face → return JPEG bytes (processed)
+    Used by Flask backend when receiving frames (already decoded from base64 or binary).
     """
-    import base64
-    import cv2
-    import numpy as np
-
     try:
-        # Decode base64 → numpy array
-        img_data = base64.b64decode(img_b64)
-        np_arr = np.frombuffer(img_data, np.uint8)
-        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        frame = _decode_jpeg(jpeg_bytes)
 
         if frame is None:
             print("✗ Invalid frame data received")
-            return img_b64
+            return jpeg_bytes
 
         # --- DNN Face Detection ---
         (h, w) = frame.shape[:2]
-        blob = cv2.dnn.blobFromImage(
-            cv2.resize(frame, (300, 300)), 1.0,
-            (300, 300), (104.0, 177.0, 123.0)
-        )
-
-        net.setInput(blob)
-        detections = net.forward()
-
-        # Loop over detections
-        for i in range(0, detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-
-            if confidence > confidence_threshold:
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                (x1, y1, x2, y2) = box.astype("int")
-
-                # Validasi posisi agar tetap di dalam frame
-                x1, y1 = max(0, x1), max(0, y1)
-                x2, y2 = min(w, x2), min(h, y2)
-
-                # Potong area wajah
-                face = frame[y1:y2, x1:x2]
-                if face.size > 0:
-                    # Terapkan Gaussian blur ke area wajah
-                    face = cv2.GaussianBlur(face, (51, 51), 30)
-                    frame[y1:y2, x1:x2] = face
-
-        # Encode kembali hasil frame ke base64
-        _, buffer = cv2.imencode('.jpg', frame)
-        processed_b64 = base64.b64encode(buffer).decode('ascii')
-        return processed_b64
+        blob = _make_blob(frame)
+
+        frame_net = get_net()
+        frame_net.setInput(blob)
+        detections = frame_net.forward()
+
+        # Koordinat wajah (sudah di-clip ke dalam frame) dihitung sekaligus
+        xs1, ys1, xs2, ys2 = _detect_boxes(detections, w, h)
+
+        # Loop hanya atas deteksi yang lolos threshold
+        for x1, y1, x2, y2 in zip(xs1.tolist(), ys1.tolist(), xs2.tolist(), ys2.tolist()):
+            # Potong area wajah
+            face = frame[y1:y2, x1:x2]
+            if face.size > 0:
+                # Blur area wajah: 51x51 box filter (Gaussian sigma 30 pada kernel 51 hampir rata)
+                face = cv2.blur(face, (51, 51))
+                frame[y1:y2, x1:x2] = face
+
+        # Encode kembali hasil frame ke JPEG
+        return _encode_jpeg(frame, PROCESSED_JPEG_QUALITY)
 
     except Exception as e:
         print(f"✗ Error processing frame: {e}")
-        return img_b64  # fallback ke gambar asli bila error
+        return jpeg_bytes  # fallback ke gambar asli bila error
+
+
+def encode_frame_bytes(frame: np.ndarray, quality: int = 95) -> bytes:
+    """
+    Encode a BGR frame (e.g. read from shared memory) → JPEG bytes.
+    Used by the Flask backend to broadcast frames handed over by the pcd subprocess.
+    """
+    return _encode_jpeg(frame, max(30, min(95, int(quality))))
+
+
+def process_frame_base64(img_b64: str) -> str:
+    """
+    Receive base64 image → decode → blur face → return base64 image (processed)
+    Thin wrapper around process_frame_bytes for callers that still speak base64.
+    """
+    try:
+        img_data = base64.b64decode(img_b64, validate=True)
+    except Exception as e:
+        print(f"✗ Invalid base64 frame: {e}")
+        return img_b64
+    return base64.b64encode(process_frame_bytes(img_data)).decode('ascii')
 
 
 print("✓ Module ready: pcd_main loaded")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Convert the res10 Caffe face detector to OpenVINO IR (FP16, optionally INT8).
+
+services/pcd_main.py picks up models/face_ssd.xml/.bin automatically (override with
+DNN_IR_MODEL) and runs it through OpenCV's Inference Engine backend.
+
+Requirements:
+    pip install "openvino-dev<2024"   # Model Optimizer (`mo`) still reads Caffe models
+    pip install nncf                  # only for --int8
+
+Usage (from backend/):
+    python tools/quantize_face_ssd.py
+    python tools/quantize_face_ssd.py --int8 --calib recordings/ --calib-frames 200
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODELS_DIR = os.path.join(BACKEND_DIR, 'models')
+PROTOTXT = os.path.join(MODELS_DIR, 'deploy.prototxt.txt')
+CAFFEMODEL = os.path.join(MODELS_DIR, 'res10_300x300_ssd_iter_140000.caffemodel')
+MODEL_NAME = 'face_ssd'
+
+# Must match the preprocessing in pcd_main._make_blob
+_MEAN = np.array([104.0, 177.0, 123.0], dtype=np.float32).reshape(3, 1, 1)
+_IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def run_mo(output_dir, fp16=True):
+    """Run the Model Optimizer on the Caffe model; returns the path of the generated .xml."""
+    mo = shutil.which('mo')
+    if not mo:
+        print("✗ Model Optimizer 'mo' not found. Install it with: pip install \"openvino-dev<2024\"")
+        return None
+    cmd = [
+        mo,
+        '--input_model', CAFFEMODEL,
+        '--input_proto', PROTOTXT,
+        '--output_dir', output_dir,
+        '--model_name', MODEL_NAME,
+    ]
+    # openvino-dev 2023.x compresses weights to FP16 by default, so FP32 has to be asked for explicitly
+    cmd.append('--compress_to_fp16' if fp16 else '--compress_to_fp16=False')
+    print(f"✓ Converting Caffe model ({'FP16' if fp16 else 'FP32'})...")
+    result = subprocess.run(cmd)
+    xml_path = os.path.join(output_dir, MODEL_NAME + '.xml')
+    if result.returncode != 0 or not os.path.exists(xml_path):
+        print("✗ Model Optimizer failed")
+        return None
+    return xml_path
+
+
+def iter_calibration_frames(source, limit):
+    """Yield up to `limit` BGR frames from an image directory or a video file."""
+    if os.path.isdir(source):
+        paths = sorted(p for p in glob.glob(os.path.join(source, '**', '*'), recursive=True)
+                       if os.path.splitext(p)[1].lower() in _IMAGE_EXTS)
+        count = 0
+        for path in paths:
+            img = cv2.imread(path)
+            if img is None:
+                continue
+            yield img
+            count += 1
+            if count >= limit:
+                return
+        return
+
+    cap = cv2.VideoCapture(source)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or limit
+        step = max(1, total // limit)  # spread the samples over the whole video
+        index = 0
+        count = 0
+        while count < limit:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if index % step == 0:
+                yield frame
+                count += 1
+            index += 1
+    finally:
+        cap.release()
+
+
+def make_blob(image):
+    resized = cv2.resize(image, (300, 300), interpolation=cv2.INTER_LINEAR)
+    return (resized.transpose(2, 0, 1).astype(np.float32) - _MEAN)[np.newaxis]
+
+
+def quantize_int8(fp32_xml, output_xml, calib_source, calib_frames):
+    """Post-training INT8 quantization with NNCF (the successor of POT)."""
+    try:
+        import nncf
+        import openvino as ov
+    except ImportError as e:
+        print(f"✗ INT8 quantization needs nncf and openvino ({e})")
+        return False
+
+    frames = list(iter_calibration_frames(calib_source, calib_frames))
+    if not frames:
+        print(f"✗ No calibration frames found in {calib_source}")
+        return False
+    print(f"✓ Calibrating INT8 on {len(frames)} frames...")
+
+    model = ov.Core().read_model(fp32_xml)
+    dataset = nncf.Dataset(frames, make_blob)
+    quantized = nncf.quantize(model, dataset, subset_size=len(frames))
+    ov.save_model(quantized, output_xml)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert the face SSD to OpenVINO IR (FP16 / INT8)')
+    parser.add_argument('--output-dir', default=MODELS_DIR, help='Where face_ssd.xml/.bin are written')
+    parser.add_argument('--int8', action='store_true', help='Quantize to INT8 with NNCF')
+    parser.add_argument('--calib', help='Image directory or video file used for INT8 calibration')
+    parser.add_argument('--calib-frames', type=int, default=200, help='Number of calibration frames')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(CAFFEMODEL) or not os.path.exists(PROTOTXT):
+        print(f"✗ Caffe model not found in {MODELS_DIR}")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if not args.int8:
+        xml_path = run_mo(args.output_dir, fp16=True)
+        if not xml_path:
+            return 1
+        print(f"✓ FP16 IR written: {xml_path}")
+        return 0
+
+    if not args.calib:
+        print("✗ --int8 requires --calib <image dir or video>")
+        return 1
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_xml = run_mo(tmp, fp16=False)
+        if not fp32_xml:
+            return 1
+        output_xml = os.path.join(args.output_dir, MODEL_NAME + '.xml')
+        if not quantize_int8(fp32_xml, output_xml, args.calib, args.calib_frames):
+            return 1
+    print(f"✓ INT8 IR written: {output_xml}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""
+WSGI entry point for the Flask PCD backend (production).
+
+Socket.IO sessions live in-process, so run exactly one eventlet worker:
+
+    gunicorn --worker-class eventlet -w 1 --bind 0.0.0.0:5000 wsgi:app
+
+`python app.py` (socketio.run) is kept for local development. Unlike `python app.py`,
+this entry point does not spawn services/pcd_main.py; run it as its own process
+(see Procfile) with BACKEND_URL pointing at this server.
+"""
+
+# app.py applies eventlet monkey-patching before Flask/Socket.IO are imported
+from app import app, socketio  # noqa: F401